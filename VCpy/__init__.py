@@ -9,9 +9,18 @@ Main functions:
     month_VCpy() - Monthly vegetation cover analysis
 """
 
-from .biweekly import biweek_VCpy
-from .monthly import month_VCpy
 from .config import DEFAULT_CONFIG
 
 __version__ = "1.0.0"
-__all__ = ['biweek_VCpy', 'month_VCpy', 'DEFAULT_CONFIG']
\ No newline at end of file
+__all__ = ['biweek_VCpy', 'month_VCpy', 'DEFAULT_CONFIG']
+
+def __getattr__(name):
+    # Processing modules pull in earthengine-api and geedim, so import them on
+    # first use; the CLI and DEFAULT_CONFIG then load without those dependencies
+    if name == 'biweek_VCpy':
+        from .biweekly import biweek_VCpy
+        return biweek_VCpy
+    if name == 'month_VCpy':
+        from .monthly import month_VCpy
+        return month_VCpy
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -6,10 +6,11 @@ import ee
 import os
 import time
 import concurrent.futures
-from datetime import datetime
+from functools import partial
+from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from .core import VCProcessor
-from .utils import create_output_directory, export_with_geedim, maskS2clouds, addNDVI
+from .utils import create_output_directory, export_with_geedim, maskAndAddNDVI, compositeNDVI, with_retry, NDVI_REDUCERS
 
 def biweek_VCpy(
     service_account_email: str = None,
@@ -20,8 +21,9 @@ def biweek_VCpy(
     ndvi_threshold: float = 0.15,
     cloud_cover_max: int = 15,
     acquisition_window: int = 21,
-    max_workers: int = 4,
+    max_workers: int = 25,
     export_ndvi: bool = False,
+    export_mode: str = 'pairs',
     metro_asset: str = None,
     crs: str = 'EPSG:32638',
     scale: int = 10,
@@ -39,12 +41,13 @@ def biweek_VCpy(
         ndvi_threshold: NDVI threshold for vegetation cover
         cloud_cover_max: Maximum cloud cover percentage
         acquisition_window: Acquisition window in days
-        max_workers: Number of parallel workers
+        max_workers: Number of parallel workers (high-volume endpoint required above ~4)
         export_ndvi: Whether to export NDVI images
+        export_mode: 'pairs' for one file per month, 'combined' for one multi-band file
         metro_asset: Asset path for metro region
         crs: Coordinate reference system
         scale: Pixel scale in meters
-        dtype: Data type for export
+        dtype: Data type for NDVI export (VC uses vc_dtype, default int8)
         
     Returns:
         Dict with processing results
@@ -79,6 +82,7 @@ def biweek_VCpy(
         'acquisition_window': acquisition_window,
         'max_workers': max_workers,
         'export_ndvi': export_ndvi,
+        'export_mode': export_mode,
         'crs': crs,
         'scale': scale,
         'dtype': dtype,
@@ -99,12 +103,41 @@ class BiweeklyProcessor(VCProcessor):
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
-        # Initialize cloud mask and NDVI functions
-        self.maskS2clouds = maskS2clouds
-        self.addNDVI = lambda img: addNDVI(img, self.config['ndvi_threshold'])
-        self.export_with_geedim = lambda img, filename: export_with_geedim(
-            img, filename, self.region, self.config
+        # Validate the NDVI reducer once rather than failing inside every period
+        self.ndvi_reducer = self.config.get('ndvi_reducer', 'qualityMosaic')
+        if self.ndvi_reducer not in NDVI_REDUCERS:
+            raise ValueError(f"Unknown NDVI reducer: {self.ndvi_reducer} (expected one of {', '.join(NDVI_REDUCERS)})")
+        
+        # Initialize fused cloud mask + NDVI function
+        self.maskAndAddNDVI = partial(
+            maskAndAddNDVI,
+            ndvi_threshold=self.config['ndvi_threshold'],
+            emit_ndvi=self.config['export_ndvi']
         )
+        self.export_with_geedim = lambda img, filename, dtype=None, num_threads=None: export_with_geedim(
+            img, filename, self.region, self.config, dtype, num_threads
+        )
+        
+        # Constant metadata fields; per-period keys are placeholders so the
+        # CSV column order is fixed by this template
+        self._metadata_template = {
+            'Year': self.config['year'],
+            'Months_Processed': self.config['months'],
+            'Period_Number': None,
+            'Period_Label': None,
+            'Output_Start': None,
+            'Output_End': None,
+            'Acquisition_Start': None,
+            'Acquisition_End': None,
+            'Acquisition_Window_Days': self.config['acquisition_window'],
+            'Image_Count': None,
+            'QA_Flag': None,
+            'Source_Images': None,
+            'NDVI_Threshold': self.config['ndvi_threshold'],
+            'Cloud_Cover_Max': self.config['cloud_cover_max'],
+            'Data_Type': 'VC',
+            'Processing_Date': None
+        }
     
     def create_biweekly_periods(self) -> List[Dict[str, Any]]:
         """Create bi-weekly periods for processing"""
@@ -113,18 +146,23 @@ class BiweeklyProcessor(VCProcessor):
         total_periods = months * 2
         periods = []
         
+        base_date = ee.Date.fromYMD(year, 1, 1)
+        
         for period in range(1, total_periods + 1):
             start_day = (period - 1) * 15 + 1
             end_day = min(period * 15, 365)
             
-            start_date = ee.Date.fromYMD(year, 1, 1).advance(start_day - 1, 'day')
-            output_end = ee.Date.fromYMD(year, 1, 1).advance(end_day - 1, 'day')
+            start_date = base_date.advance(start_day - 1, 'day')
+            output_end = base_date.advance(end_day - 1, 'day')
+            
+            # Labels are computed client-side, no Earth Engine round-trip
+            label = (datetime(year, 1, 1) + timedelta(days=start_day - 1)).strftime('%Y-%m-%d')
             
             periods.append({
                 'period': period,
                 'start': start_date,
                 'output_end': output_end,
-                'label': start_date.format('YYYY-MM-dd').getInfo()
+                'label': label
             })
         
         print(f'📅 Processing {months} months ({total_periods} bi-weekly periods)')
@@ -145,38 +183,42 @@ class BiweeklyProcessor(VCProcessor):
         output_end = period_info['output_end']
         end = start.advance(self.config['acquisition_window'], 'days')
         
-        # Get Sentinel-2 image collection
+        # Get Sentinel-2 image collection. Cheap metadata filters (date, cloud
+        # percentage) run first so filterBounds only intersects the survivors
         ic = ee.ImageCollection('COPERNICUS/S2_HARMONIZED') \
             .filterDate(start, end) \
             .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', self.config['cloud_cover_max'])) \
-            .filterBounds(self.metro)
-        
-        image_count = ic.size().getInfo()
+            .filterBounds(self.clip_geom) \
+            .select(['B4', 'B8', 'QA60'])
+        
+        # Fetch count, source names and dates in one round-trip
+        info_fields = {
+            'count': ic.size(),
+            'start': start.format('YYYY-MM-dd'),
+            'end': end.format('YYYY-MM-dd'),
+            'output_end': output_end.format('YYYY-MM-dd')
+        }
+        if self.config.get('record_source_images', True):
+            info_fields['names'] = ic.limit(20).aggregate_array('system:index')
+        info = with_retry(ee.Dictionary(info_fields).getInfo)
         
-        # Get source image names
-        source_names = []
-        if image_count > 0:
-            source_names = ic.limit(20).aggregate_array('system:index').getInfo()
+        image_count = info['count']
+        source_names = info.get('names', [])
         
         # Create metadata
-        metadata = {
-            'Year': self.config['year'],
-            'Months_Processed': self.config['months'],
+        metadata = self._metadata_template.copy()
+        metadata.update({
             'Period_Number': period_num,
             'Period_Label': label,
-            'Output_Start': start.format('YYYY-MM-dd').getInfo(),
-            'Output_End': output_end.format('YYYY-MM-dd').getInfo(),
-            'Acquisition_Start': start.format('YYYY-MM-dd').getInfo(),
-            'Acquisition_End': end.format('YYYY-MM-dd').getInfo(),
-            'Acquisition_Window_Days': self.config['acquisition_window'],
+            'Output_Start': info['start'],
+            'Output_End': info['output_end'],
+            'Acquisition_Start': info['start'],
+            'Acquisition_End': info['end'],
             'Image_Count': image_count,
             'QA_Flag': image_count > 0,
             'Source_Images': ', '.join(source_names[:10]) + ('...' if len(source_names) > 10 else ''),
-            'NDVI_Threshold': self.config['ndvi_threshold'],
-            'Cloud_Cover_Max': self.config['cloud_cover_max'],
-            'Data_Type': 'VC',
             'Processing_Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+        })
         
         result = {
             'period': period_num,
@@ -188,31 +230,31 @@ class BiweeklyProcessor(VCProcessor):
         }
         
         if image_count == 0:
-            result['vc_image'] = ee.Image.constant(0).rename('vc').clip(self.metro).rename(label)
+            result['vc_image'] = ee.Image.constant(0).rename('vc').clip(self.clip_geom).rename(label)
             if self.config['export_ndvi']:
-                result['ndvi_image'] = ee.Image.constant(-9999).rename('ndvi').clip(self.metro).rename(label)
+                result['ndvi_image'] = ee.Image.constant(-9999).rename('ndvi').clip(self.clip_geom).rename(label)
             return result
         
         # Process images
-        processed_ic = ic.map(self.maskS2clouds).map(self.addNDVI)
+        processed_ic = ic.map(self.maskAndAddNDVI)
         
         # Create VC mosaic
         vc_mosaic = processed_ic.select('vc').mosaic() \
             .unmask(0) \
-            .clip(self.metro) \
+            .clip(self.clip_geom) \
             .round()
         result['vc_image'] = vc_mosaic.rename(label)
         
         # Create NDVI mosaic if needed
         if self.config['export_ndvi']:
-            ndvi_mosaic = processed_ic.select('ndvi').mean() \
+            ndvi_mosaic = compositeNDVI(processed_ic, self.ndvi_reducer) \
                 .unmask(-9999) \
-                .clip(self.metro)
+                .clip(self.clip_geom)
             result['ndvi_image'] = ndvi_mosaic.rename(label)
             
             # Add NDVI metadata
             ndvi_metadata = metadata.copy()
-            ndvi_metadata['Data_Type'] = 'NDVI_mean'
+            ndvi_metadata['Data_Type'] = f"NDVI_{self.ndvi_reducer}"
             result['ndvi_metadata'] = ndvi_metadata
         
         return result
@@ -224,6 +266,9 @@ class BiweeklyProcessor(VCProcessor):
         
         results = []
         
+        # Threads, not processes: the work is latency-bound EE REST calls, and
+        # ee objects share the already initialized session across threads
+        # (they would have to be re-initialized and pickled per process)
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.config['max_workers']) as executor:
             future_to_period = {
                 executor.submit(self.process_period, period_info): period_info['period']
@@ -247,7 +292,7 @@ class BiweeklyProcessor(VCProcessor):
                     placeholder = {
                         'period': period_num,
                         'label': f'period_{period_num}',
-                        'vc_image': ee.Image.constant(0).rename('vc').clip(self.metro)
+                        'vc_image': ee.Image.constant(0).rename('vc').clip(self.clip_geom)
                                     .rename(f'period_{period_num}'),
                         'image_count': 0,
                         'source_names': [],
@@ -264,7 +309,7 @@ class BiweeklyProcessor(VCProcessor):
                     }
                     if self.config['export_ndvi']:
                         placeholder['ndvi_image'] = ee.Image.constant(-9999).rename('ndvi') \
-                                                    .clip(self.metro).rename(f'period_{period_num}')
+                                                    .clip(self.clip_geom).rename(f'period_{period_num}')
                     results.append(placeholder)
         
         results.sort(key=lambda x: x['period'])
@@ -274,19 +319,23 @@ class BiweeklyProcessor(VCProcessor):
         return results
     
     def export_files(self, results: List[Dict]) -> tuple:
-        """Export image files"""
-        # Define period pairs
-        period_pairs = ['01_02', '03_04', '05_06', '07_08', '09_10', 
-                       '11_12', '13_14', '15_16', '17_18', '19_20', '21_22', '23_24']
+        """Export image files (one combined file or one file per pair of periods)"""
+        # Define file groups as (filename suffix, period numbers)
+        total_periods = self.config['months'] * 2
         
-        needed_pairs = period_pairs[:self.config['months']]
+        if self.config.get('export_mode', 'pairs') == 'combined':
+            file_groups = [(f"01_{total_periods:02d}", list(range(1, total_periods + 1)))]
+            group_kind = "combined file"
+        else:
+            file_groups = [(f"{p:02d}_{p + 1:02d}", [p, p + 1]) for p in range(1, total_periods, 2)]
+            group_kind = "pairs"
         
         if self.config['export_ndvi']:
-            print(f"\n📊 Exporting {len(needed_pairs)} pairs (VC + NDVI)...")
-            total_files = len(needed_pairs) * 2
+            print(f"\n📊 Exporting {len(file_groups)} {group_kind} (VC + NDVI)...")
+            total_files = len(file_groups) * 2
         else:
-            print(f"\n📊 Exporting {len(needed_pairs)} VC pairs (NDVI disabled)...")
-            total_files = len(needed_pairs)
+            print(f"\n📊 Exporting {len(file_groups)} VC {group_kind} (NDVI disabled)...")
+            total_files = len(file_groups)
         
         print("=" * 70)
         
@@ -297,44 +346,60 @@ class BiweeklyProcessor(VCProcessor):
         export_start = time.time()
         successful_exports = 0
         
-        for i, periods in enumerate(needed_pairs):
-            start_period = i * 2 + 1
-            end_period = i * 2 + 2
-            
+        # Collect (filename, image, dtype) jobs for all groups
+        export_jobs = []
+        results_by_period = {r['period']: r for r in results}
+        
+        for periods, period_nums in file_groups:
             if self.config['export_ndvi']:
-                print(f"\n📦 Exporting pair {periods} (VC + NDVI)...")
+                print(f"\n📦 Queueing periods {periods} (VC + NDVI)...")
             else:
-                print(f"\n📦 Exporting VC pair {periods}...")
+                print(f"\n📦 Queueing VC periods {periods}...")
             
-            # Get results for this pair
-            pair_results = [r for r in results if start_period <= r['period'] <= end_period]
+            # Get results for this group
+            group_results = [results_by_period.get(p) for p in period_nums]
             
-            if len(pair_results) == 2:
+            if None not in group_results:
                 # Extract VC images
-                vc_images = [r['vc_image'] for r in pair_results]
-                labels = [r['label'] for r in pair_results]
+                vc_images = [r['vc_image'] for r in group_results]
+                labels = [r['label'] for r in group_results]
                 
                 # Create combined VC image
-                vc_combined = ee.ImageCollection(vc_images).toBands().rename(labels).clip(self.metro)
+                vc_combined = ee.Image.cat(vc_images).rename(labels).clip(self.clip_geom)
                 
-                # FIXED: Line 231 - Changed to use double quotes outside, single quotes inside
                 vc_filename = f"{self.config['year']}_BiWeekly_VC_{periods}.tif"
-                if self.export_with_geedim(vc_combined, vc_filename):
-                    successful_exports += 1
-                
-                time.sleep(1)
+                export_jobs.append((vc_filename, vc_combined, self.config.get('vc_dtype', 'int8')))
                 
                 # Export NDVI if enabled
                 if self.config['export_ndvi']:
-                    ndvi_images = [r['ndvi_image'] for r in pair_results]
-                    ndvi_combined = ee.ImageCollection(ndvi_images).toBands().rename(labels).clip(self.metro)
-                    # FIXED: Line 238 - Changed to use double quotes outside, single quotes inside
+                    ndvi_images = [r['ndvi_image'] for r in group_results]
+                    ndvi_combined = ee.Image.cat(ndvi_images).rename(labels).clip(self.clip_geom)
                     ndvi_filename = f"{self.config['year']}_BiWeekly_NDVI_{periods}.tif"
-                    if self.export_with_geedim(ndvi_combined, ndvi_filename):
-                        successful_exports += 1
-                    time.sleep(1)
+                    export_jobs.append((ndvi_filename, ndvi_combined, self.config['dtype']))
             else:
-                print(f"  ⚠️ Missing data for pair {periods}")
+                print(f"  ⚠️ Missing data for periods {periods}")
+        
+        # Downloads are I/O-bound, so run them in parallel. geedim already fetches
+        # tiles concurrently within each download, so split the max_workers
+        # budget between files and tiles instead of multiplying it
+        pool_size = max(1, min(self.config['max_workers'], len(export_jobs)))
+        tile_threads = max(1, self.config['max_workers'] // pool_size)
+        print(f"\n⚡ Exporting {len(export_jobs)} files with {pool_size} workers "
+              f"({tile_threads} tile threads each)...")
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=pool_size) as executor:
+            future_to_filename = {
+                executor.submit(self.export_with_geedim, image, filename, dtype, tile_threads): filename
+                for filename, image, dtype in export_jobs
+            }
+            
+            for future in concurrent.futures.as_completed(future_to_filename):
+                filename = future_to_filename[future]
+                try:
+                    if future.result():
+                        successful_exports += 1
+                except Exception as e:
+                    print(f"  ❌ Export failed for {filename}: {str(e)[:100]}")
         
         export_time = time.time() - export_start
         
@@ -384,25 +449,29 @@ class BiweeklyProcessor(VCProcessor):
         
         # List generated files
         if os.path.exists(self.config['output_path']):
-            files = os.listdir(self.config['output_path'])
-            tif_files = [f for f in files if f.endswith('.tif')]
-            csv_files = [f for f in files if f.endswith('.csv')]
+            # One directory scan; sizes come from the DirEntry stat
+            tif_files = []
+            csv_files = []
+            with os.scandir(self.config['output_path']) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.tif'):
+                        tif_files.append((entry.name, entry.stat().st_size))
+                    elif entry.name.endswith('.csv'):
+                        csv_files.append((entry.name, entry.stat().st_size))
             
             if tif_files or csv_files:
                 print(f"\n📁 Generated files in {self.config['output_path']}:")
                 
                 if tif_files:
                     print(f"  Image files ({len(tif_files)}):")
-                    for file in sorted(tif_files):
-                        file_path = os.path.join(self.config['output_path'], file)
-                        file_size = os.path.getsize(file_path) / (1024 * 1024)
+                    for file, size in sorted(tif_files):
+                        file_size = size / (1024 * 1024)
                         print(f"    • {file} ({file_size:.1f} MB)")
                 
                 if csv_files:
                     print(f"  Metadata files ({len(csv_files)}):")
-                    for file in sorted(csv_files):
-                        file_path = os.path.join(self.config['output_path'], file)
-                        file_size = os.path.getsize(file_path) / 1024
+                    for file, size in sorted(csv_files):
+                        file_size = size / 1024
                         print(f"    • {file} ({file_size:.1f} KB)")
             else:
                 print("\n⚠️ No files were generated")
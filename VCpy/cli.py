@@ -4,8 +4,6 @@ Command Line Interface for VCpy
 
 import argparse
 import sys
-from .biweekly import biweek_VCpy
-from .monthly import month_VCpy
 
 def run_biweekly():
     """Run bi-weekly VC analysis from command line"""
@@ -30,9 +28,16 @@ Examples:
                        help='Maximum cloud cover percentage (default: 40)')
     parser.add_argument('--export-ndvi', action='store_true',
                        help='Export NDVI images in addition to VC')
+    parser.add_argument('--export-mode', default='pairs', choices=['pairs', 'combined'],
+                       help='One file per month or one multi-band file (default: pairs)')
+    parser.add_argument('--max-workers', type=int, default=25,
+                       help='Number of parallel workers (default: 25)')
     
     args = parser.parse_args()
     
+    # Imported after argument parsing so --help does not load Earth Engine
+    from .biweekly import biweek_VCpy
+    
     print(f"🚀 Starting bi-weekly VC analysis for {args.year} ({args.months} months)")
     
     result = biweek_VCpy(
@@ -41,7 +46,9 @@ Examples:
         output_path=args.output_path,
         ndvi_threshold=args.ndvi_threshold,
         cloud_cover_max=args.cloud_cover_max,
-        export_ndvi=args.export_ndvi
+        export_ndvi=args.export_ndvi,
+        export_mode=args.export_mode,
+        max_workers=args.max_workers
     )
     
     if result.get('success'):
@@ -78,6 +85,8 @@ Examples:
                        help='NDVI threshold for vegetation cover (default: 0.15)')
     parser.add_argument('--cloud-cover-max', type=int, default=15,
                        help='Maximum cloud cover percentage (default: 15)')
+    parser.add_argument('--max-workers', type=int, default=25,
+                       help='Number of parallel workers (default: 25)')
     
     args = parser.parse_args()
     
@@ -85,6 +94,9 @@ Examples:
     if args.start_month > args.end_month:
         parser.error("start-month must be <= end-month")
     
+    # Imported after argument parsing so --help does not load Earth Engine
+    from .monthly import month_VCpy
+    
     print(f"🚀 Starting monthly VC analysis for {args.year} (months {args.start_month}-{args.end_month})")
     
     result = month_VCpy(
@@ -94,7 +106,8 @@ Examples:
         output_path=args.output_path,
         ndvi_threshold=args.ndvi_threshold,
         cloud_cover_max=args.cloud_cover_max,
-        export_ndvi=args.export_ndvi  # ADDED THIS LINE!
+        export_ndvi=args.export_ndvi,
+        max_workers=args.max_workers
     )
     
     if result.get('success'):
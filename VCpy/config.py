@@ -10,6 +10,9 @@ DEFAULT_CONFIG = {
     # Authentication
     'service_account_email': "vegcov-mailer@ee-dijogergo.iam.gserviceaccount.com",
     'service_account_key_file': r"D:\Gergo\GEEpy\json\ee-dijogergo-c8a021808704.json",
+    # High-volume endpoint: required for max_workers beyond a handful of
+    # concurrent requests (the standard endpoint throttles parallel calls)
+    'ee_endpoint': "https://earthengine-highvolume.googleapis.com",
 
     # Output path
     'output_base_path': r"D:\Gergo\GEEpy\output",
@@ -22,10 +25,14 @@ DEFAULT_CONFIG = {
     'ndvi_threshold': 0.15,
     'cloud_cover_max': 15,
     'acquisition_window': 21,  # For bi-weekly
-    'max_workers': 4,
+    'max_workers': 25,         # Needs the high-volume endpoint (ee_endpoint)
     
     # Export control
     'export_ndvi': False,      # For bi-weekly
+    'export_mode': 'pairs',    # For bi-weekly: 'pairs' (one file per month) or 'combined' (one multi-band file)
+    'composite_export_mode': 'bands',  # For monthly: 'bands' (parallel per-band downloads) or 'single'
+    'ndvi_reducer': 'qualityMosaic',  # Bi-weekly NDVI composite: 'qualityMosaic' (max) or 'mean'
+    'record_source_images': True,     # Bi-weekly: list source image names in metadata CSV
     
     # Spatial assets
     'metro_asset': "projects/ee-dijogergo/assets/METRO",
@@ -34,7 +41,15 @@ DEFAULT_CONFIG = {
     # Export parameters
     'crs': 'EPSG:32638',
     'scale': 10,
-    'dtype': 'float32'
+    'dtype': 'float32',
+    'vc_dtype': 'int8',         # Bi-weekly VC band is 0/1; int8 (not uint8) as geedim tags uint8 0 as nodata
+    'export_max_tile_size': 32,  # Max geedim download tile size in MB (Earth Engine caps at 32)
+    
+    # Export cache: reuse identical earlier downloads (same image graph, region,
+    # crs, scale, dtype). Disabled by default since new Sentinel-2 scenes for a
+    # recent period do not change the key and would be missed
+    'export_cache_dir': None,
+    'export_cache_max_gb': 5
 }
 
 def validate_config(config: Dict[str, Any]) -> bool:
@@ -8,16 +8,25 @@ import time
 import csv
 import concurrent.futures
 from datetime import datetime
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
 from .utils import maskS2clouds, addNDVI, export_with_geedim
 
+@lru_cache(maxsize=None)
+def _load_metro(metro_asset: str) -> Tuple[ee.FeatureCollection, ee.Geometry]:
+    """Load the metro FeatureCollection and its geometry once per asset path"""
+    metro = ee.FeatureCollection(metro_asset)
+    return metro, metro.geometry()
+
 class VCProcessor:
     """Base class for VC processing"""
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-        self.metro = ee.FeatureCollection(config['metro_asset'])
-        self.region = self.metro.geometry()
+        self.metro, self.region = _load_metro(config['metro_asset'])
+        # Single geometry handle reused for filterBounds/clip so the server-side
+        # graph does not re-expand the FeatureCollection on every call
+        self.clip_geom = self.region
         
         # Initialize output path
         self.config['output_path'] = config.get('output_path', 
@@ -44,26 +53,28 @@ class VCProcessor:
         print(f"\n📊 Exporting metadata to CSV: {filename}")
         
         try:
-            # Collect all metadata records
-            all_metadata = []
-            for result in results:
-                if 'metadata' in result:
-                    all_metadata.append(result['metadata'])
+            # Stream metadata records, peeking at the first for the header
+            metadata_records = (result['metadata'] for result in results if 'metadata' in result)
+            first_record = next(metadata_records, None)
             
-            if not all_metadata:
+            if first_record is None:
                 print("  ⚠️ No metadata to export")
                 return False
             
             # Write to CSV
             with open(full_path, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = all_metadata[0].keys()
+                fieldnames = first_record.keys()
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
-                writer.writerows(all_metadata)
+                writer.writerow(first_record)
+                record_count = 1
+                for record in metadata_records:
+                    writer.writerow(record)
+                    record_count += 1
             
             file_size = os.path.getsize(full_path) / 1024
             print(f"  ✅ Metadata CSV exported: {full_path} ({file_size:.1f} KB)")
-            print(f"  📋 {len(all_metadata)} records written")
+            print(f"  📋 {record_count} records written")
             
             return True
             
@@ -5,11 +5,13 @@ Monthly VC processing module
 import ee
 import os
 import time
+import shutil
 import concurrent.futures
+from functools import partial
 from datetime import datetime
 from typing import List, Dict, Any
 from .core import VCProcessor
-from .utils import create_output_directory, export_with_geedim, maskS2clouds, addNDVI
+from .utils import create_output_directory, export_with_geedim, maskAndAddNDVI, with_retry, merge_band_files
 
 def month_VCpy(
     service_account_email: str = None,
@@ -20,7 +22,7 @@ def month_VCpy(
     end_month: int = 12,
     ndvi_threshold: float = 0.15,
     cloud_cover_max: int = 15,
-    max_workers: int = 4,
+    max_workers: int = 25,
     export_ndvi: bool = False,
     metro_asset: str = None,
     aoi_asset: str = None,
@@ -40,7 +42,7 @@ def month_VCpy(
         end_month: Ending month (1-12)
         ndvi_threshold: NDVI threshold for vegetation cover
         cloud_cover_max: Maximum cloud cover percentage
-        max_workers: Number of parallel workers
+        max_workers: Number of parallel workers (high-volume endpoint required above ~4)
         export_ndvi: Whether to export NDVI images in addition to VC
         metro_asset: Asset path for metro region
         aoi_asset: Asset path for AOI region
@@ -107,13 +109,37 @@ class MonthlyProcessor(VCProcessor):
             self.aoi = ee.FeatureCollection(config['aoi_asset'])
         else:
             self.aoi = self.metro
-        
-        # Initialize cloud mask and NDVI functions
-        self.maskS2clouds = maskS2clouds
-        self.addNDVI = lambda img: addNDVI(img, self.config['ndvi_threshold'])
-        self.export_with_geedim = lambda img, filename: export_with_geedim(
-            img, filename, self.region, self.config
+        # Geometry used for the coverage reduction, expanded once
+        self._aoi_geom = self.aoi.geometry()
+        
+        # Initialize fused cloud mask + NDVI function
+        self.maskAndAddNDVI = partial(
+            maskAndAddNDVI,
+            ndvi_threshold=self.config['ndvi_threshold'],
+            emit_ndvi=self.config['export_ndvi']
+        )
+        self.export_with_geedim = lambda img, filename, num_threads=None, cache_image=None: export_with_geedim(
+            img, filename, self.region, self.config, num_threads=num_threads, cache_image=cache_image
         )
+        
+        # Threshold as used in filenames, e.g. 0.15 -> '0_15'
+        self._thr_str = str(self.config['ndvi_threshold']).replace('.', '_')
+        
+        # Placeholder images for months without data, built once and renamed per month.
+        # NDVI keeps the -9999 fill used by unmask(-9999) on real months so every
+        # band of the annual composite shares one nodata convention; a masked
+        # placeholder would be written with geedim's own nodata value instead
+        self._empty_vc_tpl = ee.Image.constant(0).rename('vc').clip(self.clip_geom)
+        self._empty_ndvi_tpl = ee.Image.constant(-9999).rename('ndvi').clip(self.clip_geom)
+    
+    def _fname(self, kind: str, label: str) -> str:
+        """Build a '<kind>_<label>_thr_<threshold>' file stem"""
+        return f'{kind}_{label}_thr_{self._thr_str}'
+    
+    def _annual_filename(self, kind: str) -> str:
+        """Filename of an annual composite, e.g. VC_Annual_2025_thr_0_15_01_12.tif"""
+        return self._fname(f'{kind}_Annual', self.config['year']) + \
+            f'_{self.config["start_month"]:02d}_{self.config["end_month"]:02d}.tif'
     
     def create_monthly_periods(self) -> List[Dict[str, Any]]:
         """Create monthly periods for processing"""
@@ -121,7 +147,8 @@ class MonthlyProcessor(VCProcessor):
         for month in range(self.config['start_month'], self.config['end_month'] + 1):
             start_date = ee.Date.fromYMD(self.config['year'], month, 1)
             end_date = start_date.advance(1, 'month')
-            label = start_date.format('YYYY-MM').getInfo()
+            # Label is computed client-side, no Earth Engine round-trip
+            label = f"{self.config['year']}-{month:02d}"
             periods.append({
                 'month': month,
                 'start': start_date,
@@ -148,22 +175,48 @@ class MonthlyProcessor(VCProcessor):
         ic = ee.ImageCollection('COPERNICUS/S2_HARMONIZED') \
             .filterDate(start, end) \
             .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', self.config['cloud_cover_max'])) \
-            .filterBounds(self.metro) \
+            .filterBounds(self.clip_geom) \
             .select(['B4', 'B8', 'QA60'])
         
-        image_count = ic.size().getInfo()
+        # Build the composites lazily; nothing is computed until getInfo
+        processed_ic = ic.map(self.maskAndAddNDVI)
+        vc_mosaic = processed_ic.select('vc').mosaic().rename(label).clip(self.clip_geom)
+        
+        # Fetch count, source names and coverage in one round-trip; coverage is
+        # only evaluated server-side when the collection is not empty
+        # Source names are trimmed to their last path segment server-side
+        source_ids = ic.limit(100).aggregate_array('system:index') \
+            .map(lambda s: ee.List(ee.String(s).split('/')).get(-1))
+        info_fields = {
+            'count': ic.size(),
+            'ids': source_ids,
+            'ids_text': source_ids.slice(0, 10).join(', '),
+            'coverage': ee.Algorithms.If(
+                ic.size().gt(0),
+                # Coverage is reported to 0.1%, so an unweighted mean that may
+                # fall back to a coarser scale (bestEffort) is precise enough
+                vc_mosaic.reduceRegion(
+                    reducer=ee.Reducer.mean().unweighted(),
+                    geometry=self._aoi_geom,
+                    scale=self.config['scale'],
+                    bestEffort=True,
+                    maxPixels=1e9,
+                    tileScale=4
+                ).get(label),
+                0
+            )
+        }
+        try:
+            info = with_retry(ee.Dictionary(info_fields).getInfo)
+        except Exception as e:
+            print(f"Warning: Coverage calculation failed for {label}: {str(e)}")
+            del info_fields['coverage']
+            info = with_retry(ee.Dictionary(info_fields).getInfo)
+            info['coverage'] = 0
+        
+        image_count = info['count']
         
-        # Extract source image names
-        source_images = []
-        if image_count > 0:
-            try:
-                source_list = ic.limit(100).aggregate_array('system:index').getInfo()
-                for img_name in source_list:
-                    if isinstance(img_name, str):
-                        parts = img_name.split('/')
-                        source_images.append(parts[-1] if len(parts) >= 3 else img_name)
-            except:
-                pass
+        source_images = info['ids']
         
         if image_count == 0:
             elapsed = time.time() - start_time
@@ -171,7 +224,7 @@ class MonthlyProcessor(VCProcessor):
             result = {
                 'month': month_num,
                 'label': label,
-                'vc_mosaic': ee.Image.constant(0).rename('vc').clip(self.metro).rename(label),
+                'vc_mosaic': self._empty_vc_tpl.rename(label),
                 'image_count': 0,
                 'coverage_percent': 0,
                 'source_images': source_images,
@@ -179,37 +232,18 @@ class MonthlyProcessor(VCProcessor):
             }
             
             if self.config['export_ndvi']:
-                result['ndvi_mosaic'] = ee.Image.constant(-9999).rename('ndvi').clip(self.metro).rename(label)
+                result['ndvi_mosaic'] = self._empty_ndvi_tpl.rename(label)
             
             return result
         
-        # Process collection
-        processed_ic = ic.map(self.maskS2clouds).map(self.addNDVI)
-        
-        # Create VC mosaic
-        vc_mosaic = processed_ic.select('vc').mosaic().rename(label).clip(self.metro)
-        
         # Create NDVI mosaic if enabled
         if self.config['export_ndvi']:
             ndvi_mosaic = processed_ic.select('ndvi').mean() \
                 .unmask(-9999) \
-                .clip(self.metro) \
+                .clip(self.clip_geom) \
                 .rename(label)
         
-        # Calculate coverage percentage
-        try:
-            coverage = vc_mosaic.reduceRegion(
-                reducer=ee.Reducer.mean(),
-                geometry=self.aoi.geometry(),
-                scale=10,
-                maxPixels=1e13
-            ).get(label)
-            
-            coverage_val = coverage.getInfo() if coverage else 0
-            coverage_percent = coverage_val * 100
-        except Exception as e:
-            print(f"Warning: Coverage calculation failed for {label}: {str(e)}")
-            coverage_percent = 0
+        coverage_percent = (info.get('coverage') or 0) * 100
         
         # Create metadata
         metadata = {
@@ -218,10 +252,10 @@ class MonthlyProcessor(VCProcessor):
             'DataType': 'VC',
             'ImageCount': image_count,
             'CoveragePercent': coverage_percent,
-            'VC_Filename': f'VC_{label}_thr_{str(self.config["ndvi_threshold"]).replace(".", "_")}',
+            'VC_Filename': self._fname('VC', label),
             'Threshold': self.config['ndvi_threshold'],
             'CloudCoverMax': self.config['cloud_cover_max'],
-            'Source_Images': ', '.join(source_images[:10]) + ('...' if len(source_images) > 10 else ''),
+            'Source_Images': info['ids_text'] + ('...' if len(source_images) > 10 else ''),
             'Processing_Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
@@ -229,7 +263,7 @@ class MonthlyProcessor(VCProcessor):
         if self.config['export_ndvi']:
             ndvi_metadata = metadata.copy()
             ndvi_metadata['Data_Type'] = 'NDVI_mean'
-            ndvi_metadata['NDVI_Filename'] = f'NDVI_{label}_thr_{str(self.config["ndvi_threshold"]).replace(".", "_")}'
+            ndvi_metadata['NDVI_Filename'] = self._fname('NDVI', label)
         
         elapsed = time.time() - start_time
         print(f" ✅ {image_count} images, {coverage_percent:.1f}% VC ({elapsed:.1f}s)")
@@ -288,7 +322,7 @@ class MonthlyProcessor(VCProcessor):
                         'DataType': 'VC',
                         'ImageCount': 0,
                         'CoveragePercent': 0,
-                        'VC_Filename': f'VC_{label}_thr_{str(self.config["ndvi_threshold"]).replace(".", "_")}',
+                        'VC_Filename': self._fname('VC', label),
                         'Threshold': self.config['ndvi_threshold'],
                         'CloudCoverMax': self.config['cloud_cover_max'],
                         'Source_Images': '',
@@ -298,7 +332,7 @@ class MonthlyProcessor(VCProcessor):
                     placeholder = {
                         'month': month_num,
                         'label': label,
-                        'vc_mosaic': ee.Image.constant(0).rename('vc').clip(self.metro).rename(label),
+                        'vc_mosaic': self._empty_vc_tpl.rename(label),
                         'image_count': 0,
                         'coverage_percent': 0,
                         'source_images': [],
@@ -306,10 +340,10 @@ class MonthlyProcessor(VCProcessor):
                         'metadata': metadata
                     }
                     if self.config['export_ndvi']:
-                        placeholder['ndvi_mosaic'] = ee.Image.constant(-9999).rename('ndvi').clip(self.metro).rename(label)
+                        placeholder['ndvi_mosaic'] = self._empty_ndvi_tpl.rename(label)
                         ndvi_metadata = metadata.copy()
                         ndvi_metadata['DataType'] = 'NDVI_mean'
-                        ndvi_metadata['NDVI_Filename'] = f'NDVI_{label}_thr_{str(self.config["ndvi_threshold"]).replace(".", "_")}'
+                        ndvi_metadata['NDVI_Filename'] = self._fname('NDVI', label)
                         placeholder['ndvi_metadata'] = ndvi_metadata
                     
                     results.append(placeholder)
@@ -340,18 +374,11 @@ class MonthlyProcessor(VCProcessor):
             print("  ❌ No monthly mosaics available")
             return None, None
         
-        # Create VC composite
+        # Create VC composite (properties are set at export, see _composite_properties)
         vc_ic = ee.ImageCollection.fromImages(vc_mosaics)
         annual_vc = vc_ic.toBands() \
             .rename(labels) \
-            .clip(self.metro) \
-            .set({
-                'year': self.config['year'],
-                'threshold': self.config['ndvi_threshold'],
-                'cloud_filter': self.config['cloud_cover_max'],
-                'creation_date': datetime.now().strftime('%Y-%m-%d'),
-                'description': f'Monthly VC composite {self.config["start_month"]:02d}-{self.config["end_month"]:02d} {self.config["year"]}'
-            })
+            .clip(self.clip_geom)
         
         # Create NDVI composite if enabled
         annual_ndvi = None
@@ -359,14 +386,7 @@ class MonthlyProcessor(VCProcessor):
             ndvi_ic = ee.ImageCollection.fromImages(ndvi_mosaics)
             annual_ndvi = ndvi_ic.toBands() \
                 .rename(labels) \
-                .clip(self.metro) \
-                .set({
-                    'year': self.config['year'],
-                    'threshold': self.config['ndvi_threshold'],
-                    'cloud_filter': self.config['cloud_cover_max'],
-                    'creation_date': datetime.now().strftime('%Y-%m-%d'),
-                    'description': f'Monthly NDVI composite {self.config["start_month"]:02d}-{self.config["end_month"]:02d} {self.config["year"]}'
-                })
+                .clip(self.clip_geom)
         
         elapsed = time.time() - start_time
         print(f"  ✅ Annual composite created ({elapsed:.1f}s)")
@@ -374,15 +394,75 @@ class MonthlyProcessor(VCProcessor):
         
         return annual_vc, annual_ndvi
     
-    def export_annual_composites(self, annual_vc: ee.Image, annual_ndvi: ee.Image) -> tuple:
-        """Export annual composites to TIFF - now exports both VC and NDVI if enabled"""
+    def _composite_properties(self, kind: str) -> Dict[str, Any]:
+        """Properties written to an annual composite at export time"""
+        return {
+            'year': self.config['year'],
+            'threshold': self.config['ndvi_threshold'],
+            'cloud_filter': self.config['cloud_cover_max'],
+            'creation_date': datetime.now().strftime('%Y-%m-%d'),
+            'description': f'Monthly {kind} composite {self.config["start_month"]:02d}-{self.config["end_month"]:02d} {self.config["year"]}'
+        }
+    
+    def export_bands_parallel(self, image: ee.Image, labels: List[str], filename: str,
+                              cache_image: ee.Image = None) -> bool:
+        """Download each band of a composite in parallel and merge them into one TIFF"""
+        # Remove the previous output first so a failed run cannot leave it in place
+        full_path = os.path.join(self.config['output_path'], filename)
+        if os.path.exists(full_path):
+            print(f"  ⚠️ File {filename} already exists, overwriting...")
+            try:
+                os.remove(full_path)
+            except OSError as e:
+                print(f"  ❌ Could not remove existing {filename}: {str(e)}")
+                return False
+        
+        band_dir = f".{os.path.splitext(filename)[0]}_bands"
+        os.makedirs(os.path.join(self.config['output_path'], band_dir), exist_ok=True)
+        band_files = [os.path.join(band_dir, f"{label}.tif") for label in labels]
+        
+        # geedim already downloads tiles concurrently within each band, so split
+        # the max_workers budget between bands and tiles instead of multiplying it
+        band_workers = max(1, min(self.config['max_workers'], len(labels)))
+        tile_threads = max(1, self.config['max_workers'] // band_workers)
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=band_workers) as executor:
+            band_success = list(executor.map(
+                lambda job: self.export_with_geedim(
+                    image.select([job[0]]), job[1], tile_threads,
+                    None if cache_image is None else cache_image.select([job[0]])
+                ),
+                zip(labels, band_files)
+            ))
+        
+        success = all(band_success) and merge_band_files(
+            [os.path.join(self.config['output_path'], f) for f in band_files],
+            full_path,
+            labels
+        )
+        shutil.rmtree(os.path.join(self.config['output_path'], band_dir), ignore_errors=True)
+        
+        if success:
+            print(f'  ✅ Merged {len(labels)} bands into {filename}')
+        return success
+    
+    def export_annual_composites(self, annual_vc: ee.Image, annual_ndvi: ee.Image,
+                                 labels: List[str] = None) -> tuple:
+        """Export annual composites to TIFF - per-band in parallel when labels are given"""
+        per_band = labels and self.config.get('composite_export_mode', 'bands') == 'bands'
+        export_fn = (lambda img, filename, cache_image: self.export_bands_parallel(img, labels, filename, cache_image)) \
+            if per_band else \
+            (lambda img, filename, cache_image: self.export_with_geedim(img, filename, cache_image=cache_image))
+        
+        # The export cache is keyed on the composite without its properties, so
+        # the daily creation_date does not invalidate it
+        export = lambda img, kind, filename: export_fn(img.set(self._composite_properties(kind)), filename, img)
         vc_success = False
         ndvi_success = False
         
         # Export VC composite
         if annual_vc is not None:
-            vc_filename = f'VC_Annual_{self.config["year"]}_thr_{str(self.config["ndvi_threshold"]).replace(".", "_")}'
-            vc_filename += f'_{self.config["start_month"]:02d}_{self.config["end_month"]:02d}.tif'
+            vc_filename = self._annual_filename('VC')
             
             print(f"\n📤 Exporting VC annual composite...")
             print(f"  Filename: {vc_filename}")
@@ -390,17 +470,16 @@ class MonthlyProcessor(VCProcessor):
             num_bands = self.config['end_month'] - self.config['start_month'] + 1
             print(f"  Note: This may take several minutes (contains {num_bands} bands)")
             
-            vc_success = self.export_with_geedim(annual_vc, vc_filename)
+            vc_success = export(annual_vc, 'VC', vc_filename)
         
         # Export NDVI composite if enabled
         if self.config['export_ndvi'] and annual_ndvi is not None:
-            ndvi_filename = f'NDVI_Annual_{self.config["year"]}_thr_{str(self.config["ndvi_threshold"]).replace(".", "_")}'
-            ndvi_filename += f'_{self.config["start_month"]:02d}_{self.config["end_month"]:02d}.tif'
+            ndvi_filename = self._annual_filename('NDVI')
             
             print(f"\n📤 Exporting NDVI annual composite...")
             print(f"  Filename: {ndvi_filename}")
             
-            ndvi_success = self.export_with_geedim(annual_ndvi, ndvi_filename)
+            ndvi_success = export(annual_ndvi, 'NDVI', ndvi_filename)
         
         return vc_success, ndvi_success
     
@@ -436,14 +515,16 @@ class MonthlyProcessor(VCProcessor):
         
         # Step 5: Create and export annual composites
         annual_vc, annual_ndvi = self.create_annual_composite(results)
-        vc_success, ndvi_success = self.export_annual_composites(annual_vc, annual_ndvi)
+        composite_labels = [r['label'] for r in results if 'vc_mosaic' in r]
+        vc_success, ndvi_success = self.export_annual_composites(annual_vc, annual_ndvi, composite_labels)
         
         # ===== FILE EXISTENCE CHECK =====
-        # Also check if file actually exists (fix for false negative)
+        # Also check if file actually exists (fix for false negative). Not for
+        # per-band exports: their output only appears after a successful merge
+        check_existing = self.config.get('composite_export_mode', 'bands') != 'bands'
         vc_file_exists = False
-        if annual_vc is not None:
-            vc_filename = f'VC_Annual_{self.config["year"]}_thr_{str(self.config["ndvi_threshold"]).replace(".", "_")}'
-            vc_filename += f'_{self.config["start_month"]:02d}_{self.config["end_month"]:02d}.tif'
+        if check_existing and annual_vc is not None:
+            vc_filename = self._annual_filename('VC')
             vc_file_path = os.path.join(self.config['output_path'], vc_filename)
             vc_file_exists = os.path.exists(vc_file_path)
             if vc_file_exists and not vc_success:
@@ -451,9 +532,8 @@ class MonthlyProcessor(VCProcessor):
                 vc_success = True
         
         ndvi_file_exists = False
-        if self.config['export_ndvi'] and annual_ndvi is not None:
-            ndvi_filename = f'NDVI_Annual_{self.config["year"]}_thr_{str(self.config["ndvi_threshold"]).replace(".", "_")}'
-            ndvi_filename += f'_{self.config["start_month"]:02d}_{self.config["end_month"]:02d}.tif'
+        if check_existing and self.config['export_ndvi'] and annual_ndvi is not None:
+            ndvi_filename = self._annual_filename('NDVI')
             ndvi_file_path = os.path.join(self.config['output_path'], ndvi_filename)
             ndvi_file_exists = os.path.exists(ndvi_file_path)
             if ndvi_file_exists and not ndvi_success:
@@ -475,25 +555,29 @@ class MonthlyProcessor(VCProcessor):
         
         # List generated files
         if os.path.exists(self.config['output_path']):
-            files = os.listdir(self.config['output_path'])
-            tif_files = [f for f in files if f.endswith('.tif')]
-            csv_files = [f for f in files if f.endswith('.csv')]
+            # One directory scan; sizes come from the DirEntry stat
+            tif_files = []
+            csv_files = []
+            with os.scandir(self.config['output_path']) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.tif'):
+                        tif_files.append((entry.name, entry.stat().st_size))
+                    elif entry.name.endswith('.csv'):
+                        csv_files.append((entry.name, entry.stat().st_size))
             
             if tif_files or csv_files:
                 print(f"\n📁 Generated files in {self.config['output_path']}:")
                 
                 if tif_files:
                     print(f"  Image files ({len(tif_files)}):")
-                    for file in sorted(tif_files):
-                        file_path = os.path.join(self.config['output_path'], file)
-                        file_size = os.path.getsize(file_path) / (1024 * 1024)
+                    for file, size in sorted(tif_files):
+                        file_size = size / (1024 * 1024)
                         print(f"    • {file} ({file_size:.1f} MB)")
                 
                 if csv_files:
                     print(f"  Metadata files ({len(csv_files)}):")
-                    for file in sorted(csv_files):
-                        file_path = os.path.join(self.config['output_path'], file)
-                        file_size = os.path.getsize(file_path) / 1024
+                    for file, size in sorted(csv_files):
+                        file_size = size / 1024
                         print(f"    • {file} ({file_size:.1f} KB)")
             else:
                 print("\n⚠️ No files were generated")
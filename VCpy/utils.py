@@ -4,10 +4,62 @@ Utility functions for VCpy
 
 import ee
 import os
+import re
+import json
 import time
+import random
+import shutil
+import hashlib
+import threading
 import warnings
-from typing import Dict, Any
-import geedim
+from typing import Dict, Any, Callable, List
+
+# Supported reducers for compositeNDVI
+NDVI_REDUCERS = ('qualityMosaic', 'mean')
+
+# Phrases of Earth Engine error messages that indicate a transient failure.
+# Deterministic failures ("Too many pixels", "Computation timed out", element
+# limits) are deliberately absent: retrying them only repeats the same error
+TRANSIENT_EE_ERRORS = ('too many concurrent', 'rate limit', 'service unavailable', 'internal error')
+
+# Retryable HTTP statuses, matched as a whole status token
+TRANSIENT_HTTP_STATUS = re.compile(r'^(429|5\d\d)$')
+
+# HTTP status embedded in an error message, e.g. "<HttpError 503 ...>" or "HTTP 429"
+HTTP_STATUS_IN_MESSAGE = re.compile(r'\bhttp(?:error)?\s*(?:error\s*)?:?\s*(\d{3})\b', re.IGNORECASE)
+
+def _http_status(error: Exception) -> str:
+    """HTTP status of an Earth Engine error, or '' if it carries none"""
+    status = getattr(error, 'status', None) or getattr(getattr(error, 'resp', None), 'status', None)
+    if status is None:
+        match = HTTP_STATUS_IN_MESSAGE.search(str(error))
+        status = match.group(1) if match else ''
+    return str(status)
+
+def _is_transient(error: Exception) -> bool:
+    """Whether an Earth Engine error is worth retrying"""
+    message = str(error).lower()
+    return (any(phrase in message for phrase in TRANSIENT_EE_ERRORS)
+            or bool(TRANSIENT_HTTP_STATUS.match(_http_status(error))))
+
+def with_retry(fn: Callable, retries: int = 5):
+    """
+    Call fn, retrying transient Earth Engine errors with exponential backoff
+    
+    Args:
+        fn: Zero-argument callable, e.g. an object's getInfo method
+        retries: Maximum number of attempts
+        
+    Returns:
+        The return value of fn
+    """
+    for attempt in range(retries):
+        try:
+            return fn()
+        except ee.EEException as e:
+            if attempt == retries - 1 or not _is_transient(e):
+                raise
+            time.sleep(2 ** attempt + random.random())
 
 def initialize_earth_engine(config: Dict[str, Any]) -> bool:
     """
@@ -28,16 +80,42 @@ def initialize_earth_engine(config: Dict[str, Any]) -> bool:
             config['service_account_email'],
             config['service_account_key_file']
         )
-        ee.Initialize(credentials)
+        # The high-volume endpoint lets parallel getInfo/download calls scale
+        # with max_workers instead of being throttled
+        with_retry(lambda: ee.Initialize(credentials, opt_url=config.get('ee_endpoint')))
         # geedim will use the already initialized Earth Engine session
         print(f"✅ Initialized with service account: {config['service_account_email']}")
+        print(f"✅ Endpoint: {config.get('ee_endpoint') or 'default'}")
         print(f"✅ Earth Engine ready")
         return True
     except Exception as e:
         print(f"❌ Earth Engine initialization failed: {str(e)}")
         return False
 
-def export_with_geedim(image, filename: str, region, config: Dict[str, Any]) -> bool:
+def _export_cache_key(image, region_geojson: Dict[str, Any], config: Dict[str, Any], dtype: str) -> str:
+    """Hash of everything that determines the downloaded GeoTIFF"""
+    parts = [config['crs'], str(config['scale']), dtype,
+             json.dumps(region_geojson, sort_keys=True), image.serialize()]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+def _prune_export_cache(cache_dir: str, max_bytes: float):
+    """Remove least recently used cache files until the cache fits in max_bytes"""
+    with os.scandir(cache_dir) as entries:
+        cached = [(e.stat().st_mtime, e.stat().st_size, e.path)
+                  for e in entries if e.name.endswith('.tif')]
+    
+    total = sum(size for _, size, _ in cached)
+    for _, size, path in sorted(cached):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def export_with_geedim(image, filename: str, region, config: Dict[str, Any], dtype: str = None,
+                       num_threads: int = None, cache_image=None) -> bool:
     """
     Export image using geedim
     
@@ -46,10 +124,16 @@ def export_with_geedim(image, filename: str, region, config: Dict[str, Any]) ->
         filename: Output filename
         region: Region geometry
         config: Configuration dictionary
+        dtype: Output data type (defaults to config['dtype'])
+        num_threads: Concurrent tile downloads within geedim (geedim's default if None)
+        cache_image: Image whose graph keys the export cache, i.e. image without
+                     volatile properties such as a creation date (defaults to image)
         
     Returns:
         bool: True if successful
     """
+    import geedim
+    
     full_path = os.path.join(config['output_path'], filename)
     
     # If file already exists, remove it or handle it gracefully
@@ -65,23 +149,57 @@ def export_with_geedim(image, filename: str, region, config: Dict[str, Any]) ->
     
     try:
         # Convert the region to GeoJSON-like dictionary
-        region_geojson = region.getInfo()
+        region_geojson = with_retry(region.getInfo)
+        dtype = dtype or config['dtype']
+        
+        # Reuse an identical earlier download if the export cache is enabled
+        cache_dir = config.get('export_cache_dir')
+        if cache_dir:
+            cached_path = os.path.join(
+                cache_dir,
+                _export_cache_key(image if cache_image is None else cache_image,
+                                  region_geojson, config, dtype) + '.tif'
+            )
+            if os.path.exists(cached_path):
+                shutil.copyfile(cached_path, full_path)
+                try:
+                    # Mark as recently used; a concurrent prune may already have removed it
+                    os.utime(cached_path)
+                except OSError:
+                    pass
+                file_size = os.path.getsize(full_path) / (1024 * 1024)
+                print(f'  ✅ Restored from cache: {filename} ({file_size:.1f} MB)')
+                return True
         
         # Create a MaskedImage object first
         gd_image = geedim.MaskedImage(image)
         
-        # Then download it
+        # Then download it (geedim writes a tiled, deflate-compressed GeoTIFF)
         gd_image.download(
             full_path,
+            overwrite=True,
+            num_threads=num_threads,
+            max_tile_size=config.get('export_max_tile_size', 32),
             region=region_geojson,
             scale=config['scale'],
             crs=config['crs'],
-            dtype=config['dtype']
+            dtype=dtype
         )
         
         if os.path.exists(full_path):
             file_size = os.path.getsize(full_path) / (1024 * 1024)
             print(f'  ✅ Exported: {filename} ({file_size:.1f} MB)')
+            
+            if cache_dir:
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    # Copy under a temporary name so readers never see a partial file
+                    tmp_path = f"{cached_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    shutil.copyfile(full_path, tmp_path)
+                    os.replace(tmp_path, cached_path)
+                    _prune_export_cache(cache_dir, config.get('export_cache_max_gb', 5) * 1024 ** 3)
+                except OSError as e:
+                    print(f'  ⚠️ Could not cache {filename}: {str(e)}')
             return True
         else:
             print(f'  ❌ File not created: {filename}')
@@ -97,21 +215,110 @@ def export_with_geedim(image, filename: str, region, config: Dict[str, Any]) ->
             print(f'  ❌ Export failed for {filename}: {str(e)}')
             return False
             
-def maskS2clouds(image):
-    """Cloud masking for Sentinel-2"""
+def merge_band_files(band_paths: List[str], output_file: str, band_names: List[str] = None,
+                     overview_resampling: str = 'nearest') -> bool:
+    """
+    Merge single-band GeoTIFFs into one multi-band GeoTIFF
+    
+    Copies block by block (bands are never held whole in memory), keeps each
+    band's tags and builds overviews like the single-request geedim export.
+    
+    Args:
+        band_paths: Paths of the single-band files, in band order
+        output_file: Path of the multi-band file to write
+        band_names: Optional band descriptions
+        overview_resampling: Resampling method for the overviews
+        
+    Returns:
+        bool: True if successful
+    """
+    import rasterio
+    from rasterio.enums import Resampling
+    
+    # Write under a temporary name so a failed merge never leaves a partial output
+    tmp_file = f"{output_file}.{os.getpid()}.tmp"
+    try:
+        with rasterio.open(band_paths[0]) as first:
+            profile = first.profile.copy()
+            tags = first.tags()
+        profile.update(count=len(band_paths))
+        
+        with rasterio.open(tmp_file, 'w', **profile) as dst:
+            for band, path in enumerate(band_paths, start=1):
+                with rasterio.open(path) as src:
+                    for _, window in src.block_windows(1):
+                        dst.write(src.read(1, window=window), band, window=window)
+                    dst.update_tags(band, **src.tags(1))
+                if band_names:
+                    dst.set_band_description(band, band_names[band - 1])
+            dst.update_tags(**tags)
+            
+            # Overviews down to roughly one block, as geedim does for its downloads
+            block_size = min(dst.block_shapes[0])
+            factors = []
+            factor = 2
+            while min(dst.width, dst.height) / factor >= block_size:
+                factors.append(factor)
+                factor *= 2
+            if factors:
+                dst.build_overviews(factors, Resampling[overview_resampling])
+                dst.update_tags(ns='rio_overview', resampling=overview_resampling)
+        os.replace(tmp_file, output_file)
+        return True
+    except Exception as e:
+        print(f'  ❌ Failed to merge bands into {os.path.basename(output_file)}: {str(e)}')
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return False
+
+def build_qa60_mask(image):
+    """Single-band clear-sky mask from the Sentinel-2 QA60 band"""
     qa = image.select('QA60')
     cloudBitMask = 1 << 10
     cirrusBitMask = 1 << 11
     mask = qa.bitwiseAnd(cloudBitMask).eq(0).And(
         qa.bitwiseAnd(cirrusBitMask).eq(0))
-    return image.updateMask(mask).divide(10000)
+    return mask.rename('mask')
+
+def maskS2clouds(image):
+    """Cloud masking for Sentinel-2"""
+    return image.updateMask(build_qa60_mask(image)).divide(10000)
 
-def addNDVI(image, ndvi_threshold: float):
-    """Calculate NDVI and vegetation cover"""
+def addNDVI(image, ndvi_threshold: float, emit_ndvi: bool = True):
+    """Calculate NDVI and vegetation cover (VC only, as one expression, if emit_ndvi is False)"""
+    if not emit_ndvi:
+        vc = image.expression(
+            '(b("B8") - b("B4")) / (b("B8") + b("B4")) >= t',
+            {'t': ndvi_threshold}
+        ).rename('vc')
+        return image.addBands(vc)
     ndvi = image.normalizedDifference(['B8', 'B4']).rename('ndvi')
     vc = ndvi.gte(ndvi_threshold).rename('vc')
     return image.addBands([ndvi, vc])
 
+def compositeNDVI(collection, reducer: str = 'qualityMosaic'):
+    """
+    Composite the NDVI band of a processed collection
+    
+    Args:
+        collection: ImageCollection with an 'ndvi' band
+        reducer: 'qualityMosaic' (per-pixel maximum NDVI, best cloud-free value)
+                 or 'mean' (full pixel-wise mean, slower)
+        
+    Returns:
+        ee.Image: Single-band NDVI composite
+    """
+    ndvi = collection.select('ndvi')
+    if reducer == 'qualityMosaic':
+        return ndvi.qualityMosaic('ndvi')
+    if reducer == 'mean':
+        return ndvi.mean()
+    raise ValueError(f"Unknown NDVI reducer: {reducer}")
+
+def maskAndAddNDVI(image, ndvi_threshold: float, emit_ndvi: bool = True):
+    """Cloud masking, NDVI and vegetation cover in a single map pass"""
+    return addNDVI(maskS2clouds(image), ndvi_threshold, emit_ndvi)
+
 def create_output_directory(output_path: str) -> bool:
     """
     Create output directory if it doesn't exist
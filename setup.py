@@ -30,6 +30,7 @@ setup(
     install_requires=[
         "earthengine-api>=0.1.367",
         "geedim>=1.7.2",
+        "rasterio",
     ],
     extras_require={
         "dev": [